@@ -72,39 +72,40 @@ def _load_base_recipe(
     if recipe_overrides is None:
         recipe_overrides = dict()
 
-    temp_local_recipe = tempfile.NamedTemporaryFile(prefix="recipe_original", suffix=".yaml").name
-
-    if training_recipe.endswith(".yaml"):
-        if os.path.isfile(training_recipe):
-            shutil.copy(training_recipe, temp_local_recipe)
+    with tempfile.TemporaryDirectory(prefix="recipe_original_") as recipe_original_dir:
+        temp_local_recipe = os.path.join(recipe_original_dir, "recipe.yaml")
+
+        if training_recipe.endswith(".yaml"):
+            if os.path.isfile(training_recipe):
+                shutil.copy(training_recipe, temp_local_recipe)
+            else:
+                try:
+                    urlretrieve(training_recipe, temp_local_recipe)
+                except Exception as e:
+                    raise ValueError(
+                        f"Could not fetch the provided recipe {training_recipe}: exception {str(e)}"
+                    )
         else:
-            try:
-                urlretrieve(training_recipe, temp_local_recipe)
-            except Exception as e:
-                raise ValueError(
-                    f"Could not fetch the provided recipe {training_recipe}: exception {str(e)}"
-                )
-    else:
-        recipe_launcher_dir = tempfile.TemporaryDirectory(prefix="launcher_")
-
-        launcher_repo = os.environ.get("TRAINING_LAUNCHER_GIT", None) or training_recipes_cfg.get(
-            "launcher_repo"
-        )
-        _run_clone_command_silent(launcher_repo, recipe_launcher_dir.name)
+            recipe_launcher_dir = tempfile.TemporaryDirectory(prefix="launcher_")
+
+            launcher_repo = os.environ.get(
+                "TRAINING_LAUNCHER_GIT", None
+            ) or training_recipes_cfg.get("launcher_repo")
+            _run_clone_command_silent(launcher_repo, recipe_launcher_dir.name)
+
+            recipe = os.path.join(
+                recipe_launcher_dir.name,
+                "recipes_collection",
+                "recipes",
+                training_recipe + ".yaml",
+            )
+            if os.path.isfile(recipe):
+                shutil.copy(recipe, temp_local_recipe)
+            else:
+                raise ValueError(f"Recipe {training_recipe} not found.")
 
-        recipe = os.path.join(
-            recipe_launcher_dir.name,
-            "recipes_collection",
-            "recipes",
-            training_recipe + ".yaml",
-        )
-        if os.path.isfile(recipe):
-            shutil.copy(recipe, temp_local_recipe)
-        else:
-            raise ValueError(f"Recipe {training_recipe} not found.")
+        recipe = OmegaConf.load(temp_local_recipe)
 
-    recipe = OmegaConf.load(temp_local_recipe)
-    os.unlink(temp_local_recipe)
     recipe = OmegaConf.merge(recipe, recipe_overrides)
     return recipe
 
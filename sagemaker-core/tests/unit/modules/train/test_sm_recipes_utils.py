@@ -11,6 +11,7 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 
+import os
 import pytest
 import tempfile
 from unittest.mock import Mock, patch, MagicMock
@@ -137,6 +138,39 @@ class TestSMRecipesUtils:
         with pytest.raises(ValueError, match="Could not fetch the provided recipe"):
             _load_base_recipe("https://example.com/recipe.yaml")
 
+    @pytest.mark.parametrize("fetch_fails", [False, True], ids=["success", "fetch_error"])
+    @patch("sagemaker.core.modules.train.sm_recipes.utils.urlretrieve")
+    def test_load_base_recipe_removes_staged_recipe(self, mock_urlretrieve, fetch_fails):
+        """Test _load_base_recipe removes the staged recipe directory on success and failure"""
+        temporary_directory = tempfile.TemporaryDirectory
+        staged_dirs = []
+
+        def _temporary_directory(*args, **kwargs):
+            tmp_dir = temporary_directory(*args, **kwargs)
+            staged_dirs.append(tmp_dir.name)
+            return tmp_dir
+
+        def _urlretrieve(url, filename):
+            if fetch_fails:
+                raise Exception("Network error")
+            with open(filename, "w") as f:
+                f.write("model:\n  model_type: llama_v3\n")
+
+        mock_urlretrieve.side_effect = _urlretrieve
+        with patch(
+            "sagemaker.core.modules.train.sm_recipes.utils.tempfile.TemporaryDirectory",
+            side_effect=_temporary_directory,
+        ):
+            if fetch_fails:
+                with pytest.raises(ValueError, match="Could not fetch the provided recipe"):
+                    _load_base_recipe("https://example.com/recipe.yaml")
+            else:
+                result = _load_base_recipe("https://example.com/recipe.yaml")
+                assert result["model"]["model_type"] == "llama_v3"
+
+        assert len(staged_dirs) == 1
+        assert not os.path.exists(staged_dirs[0])
+
     def test_register_custom_resolvers(self):
         """Test _register_custom_resolvers registers OmegaConf resolvers"""
         _register_custom_resolvers()
@@ -13,18 +13,28 @@
 """Utility functions for SageMaker training recipes."""
 from __future__ import absolute_import
 
+import functools
 import math
 import os
 import json
 import re
 import shutil
 import tempfile
-from urllib.request import urlretrieve
-from typing import Dict, Any, Optional, Tuple, Union
+import threading
+from pathlib import Path
+from urllib.request import urlopen
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Union
 
 import omegaconf
 from omegaconf import OmegaConf, dictconfig
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # from sagemaker.utils.image_uris import retrieve
 
 from sagemaker.train import logger
@@ -34,126 +44,204 @@ from sagemaker.train.distributed import Torchrun, SMP
 from sagemaker.train.constants import SM_RECIPE_YAML
 
 _MODEL_PACKAGE_ARN_PATTERN = re.compile(r"^arn:aws:sagemaker:[a-z0-9-]+:\d{12}:model-package/.+$")
+_RECIPE_DOWNLOAD_TIMEOUT_SECONDS = 60
+
+# Instance family prefix -> device type used for training recipes
+_INSTANCE_FAMILY_PREFIX_TO_DEVICE_TYPE = {
+    "p": "gpu",
+    "g": "gpu",
+    "trn": "trainium",
+}
+
+# GPU model type prefix -> (model base name, training script)
+_GPU_MODEL_TYPE_TO_SCRIPT = {
+    "llama": ("llama", "llama_pretrain.py"),
+    "mistral": ("mistral", "mistral_pretrain.py"),
+    "mixtral": ("mixtral", "mixtral_pretrain.py"),
+    "deepseek": ("deepseek", "deepseek_pretrain.py"),
+}
+
+# Local checkouts of the recipe git repos, keyed by repo url, shared for the process lifetime.
+_CLONED_REPOS: Dict[str, tempfile.TemporaryDirectory] = {}
+_CLONED_REPOS_LOCK = threading.Lock()
+
+
+def _try_resolve_recipe(recipe, keys: List[Optional[str]]) -> Optional[dictconfig.DictConfig]:
+    """Try to resolve recipe wrapped in each of the keys and return the first resolved recipe.
+
+    Attempts are cumulative: an unwrapped attempt resolves the recipe in place, so
+    interpolations it resolved before failing stay resolved for the following attempts.
+    Wrapped attempts resolve a copy and leave the recipe untouched.
+    """
+    for key in keys:
+        candidate = recipe if key is None else dictconfig.DictConfig({key: recipe})
+        try:
+            OmegaConf.resolve(candidate)
+        except omegaconf.errors.OmegaConfBaseException:
+            continue
+        return candidate if key is None else candidate[key]
+    return None
+
+
+def _get_or_clone_repo(repo_url: str) -> str:
+    """Get the path to a local checkout of the repo, cloning it on first use in this process."""
+    with _CLONED_REPOS_LOCK:
+        repo_dir = _CLONED_REPOS.get(repo_url)
+        if repo_dir is None or not os.path.isdir(os.path.join(repo_dir.name, ".git")):
+            repo_dir = tempfile.TemporaryDirectory(prefix="recipe_repo_")
+            _run_clone_command_silent(repo_url, repo_dir.name)
+            _CLONED_REPOS[repo_url] = repo_dir
+    return repo_dir.name
+
+
+def _copy_cloned_repo(repo_url: str, dest_dir: str):
+    """Copy the cached checkout of the repo into dest_dir, cloning it first if needed."""
+    shutil.copytree(
+        _get_or_clone_repo(repo_url),
+        dest_dir,
+        symlinks=True,
+        ignore=shutil.ignore_patterns(".git"),
+        dirs_exist_ok=True,
+    )
 
 
-def _try_resolve_recipe(recipe, key=None):
-    """Try to resolve recipe and return resolved recipe."""
-    if key is not None:
-        recipe = dictconfig.DictConfig({key: recipe})
-    try:
-        OmegaConf.resolve(recipe)
-    except omegaconf.errors.OmegaConfBaseException:
-        return None
-    if key is None:
-        return recipe
-    return recipe[key]
-
-
+@functools.lru_cache(maxsize=256)
 def _determine_device_type(instance_type: str) -> str:
     """Determine device type (gpu, cpu, trainium) based on instance type."""
     instance_family = instance_type.split(".")[1]
-    if instance_family.startswith(("p", "g")):
-        return "gpu"
-    if instance_family.startswith("trn"):
-        return "trainium"
-    return "cpu"
+    device_type = _INSTANCE_FAMILY_PREFIX_TO_DEVICE_TYPE.get(instance_family[:3])
+    if device_type is None:
+        device_type = _INSTANCE_FAMILY_PREFIX_TO_DEVICE_TYPE.get(instance_family[:1], "cpu")
+    return device_type
 
 
-def _load_recipes_cfg() -> str:
-    """Load training recipes configuration json."""
-    training_recipes_cfg_filename = os.path.join(os.path.dirname(__file__), "training_recipes.json")
-    with open(training_recipes_cfg_filename) as training_recipes_cfg_file:
-        training_recipes_cfg = json.load(training_recipes_cfg_file)
-    return training_recipes_cfg
+@functools.lru_cache(maxsize=1)
+def _load_recipes_cfg() -> Dict[str, Any]:
+    """Load training recipes configuration json.
+
+    The configuration file ships with the package and does not change during the lifetime
+    of the process, so the parsed result is cached after the first call.
+    """
+    training_recipes_cfg_path = Path(__file__).parent / "training_recipes.json"
+    return _json_loads(training_recipes_cfg_path.read_bytes())
+
+
+class _RecipeEndpoints(NamedTuple):
+    """Git repos and training image configs used to build recipe training jobs."""
+
+    launcher_repo: str
+    adapter_repo: str
+    neuron_dist_repo: str
+    gpu_image: Union[str, Dict[str, Any]]
+    neuron_image: Union[str, Dict[str, Any]]
+
+
+@functools.lru_cache(maxsize=1)
+def _get_recipe_endpoints() -> _RecipeEndpoints:
+    """Get the recipe endpoints, honoring the ``TRAINING_*_GIT`` environment overrides.
+
+    The result is cached for the process lifetime. Call ``_get_recipe_endpoints.cache_clear()``
+    to pick up environment changes.
+    """
+    training_recipes_cfg = _load_recipes_cfg()
+    return _RecipeEndpoints(
+        launcher_repo=os.environ.get("TRAINING_LAUNCHER_GIT", None)
+        or training_recipes_cfg.get("launcher_repo"),
+        adapter_repo=os.environ.get("TRAINING_ADAPTER_GIT", None)
+        or training_recipes_cfg.get("adapter_repo"),
+        neuron_dist_repo=training_recipes_cfg.get("neuron_dist_repo"),
+        gpu_image=training_recipes_cfg.get("gpu_image"),
+        neuron_image=training_recipes_cfg.get("neuron_image"),
+    )
 
 
 def _load_base_recipe(
     training_recipe: str,
     recipe_overrides: Optional[Dict[str, Any]] = None,
-    training_recipes_cfg: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """Load recipe and apply overrides."""
     if recipe_overrides is None:
         recipe_overrides = dict()
 
-    temp_local_recipe = tempfile.NamedTemporaryFile(prefix="recipe_original", suffix=".yaml").name
-
     if training_recipe.endswith(".yaml"):
         if os.path.isfile(training_recipe):
-            shutil.copy(training_recipe, temp_local_recipe)
+            recipe = OmegaConf.load(training_recipe)
         else:
             try:
-                urlretrieve(training_recipe, temp_local_recipe)
+                with urlopen(training_recipe, timeout=_RECIPE_DOWNLOAD_TIMEOUT_SECONDS) as response:
+                    recipe_text = response.read().decode("utf-8")
             except Exception as e:
                 raise ValueError(
                     f"Could not fetch the provided recipe {training_recipe}: exception {str(e)}"
                 )
+            recipe = OmegaConf.create(recipe_text)
     else:
-        recipe_launcher_dir = tempfile.TemporaryDirectory(prefix="launcher_")
-        if training_recipes_cfg is None:
-            training_recipes_cfg = _load_recipes_cfg()
+        recipe_launcher_dir = _get_or_clone_repo(_get_recipe_endpoints().launcher_repo)
 
-        launcher_repo = os.environ.get("TRAINING_LAUNCHER_GIT", None) or training_recipes_cfg.get(
-            "launcher_repo"
-        )
-        _run_clone_command_silent(launcher_repo, recipe_launcher_dir.name)
-
-        recipe = os.path.join(
-            recipe_launcher_dir.name,
+        recipe_path = os.path.join(
+            recipe_launcher_dir,
             "recipes_collection",
             "recipes",
             training_recipe + ".yaml",
         )
-        if os.path.isfile(recipe):
-            shutil.copy(recipe, temp_local_recipe)
+        if os.path.isfile(recipe_path):
+            recipe = OmegaConf.load(recipe_path)
         else:
             raise ValueError(f"Recipe {training_recipe} not found.")
 
-    recipe = OmegaConf.load(temp_local_recipe)
-    os.unlink(temp_local_recipe)
     recipe = OmegaConf.merge(recipe, recipe_overrides)
     return recipe
 
 
+def _multiply(x, y):
+    """OmegaConf resolver for ``${multiply:x,y}``."""
+    return x * y
+
+
+def _divide_ceil(x, y):
+    """OmegaConf resolver for ``${divide_ceil:x,y}``."""
+    return int(math.ceil(x / y))
+
+
+def _divide_floor(x, y):
+    """OmegaConf resolver for ``${divide_floor:x,y}``."""
+    return int(math.floor(x / y))
+
+
+def _add(*numbers):
+    """OmegaConf resolver for ``${add:x,y,...}``."""
+    return sum(numbers)
+
+
 def _register_custom_resolvers():
-    """Register custom resolvers for OmegaConf."""
+    """Register custom resolvers for OmegaConf.
+
+    Called once when this module is imported. Resolvers that are already registered
+    under the same name are left untouched. Newer omegaconf releases deprecate
+    ``register_new_resolver`` in favour of ``register_resolver``, so the latter is used
+    when available to keep the import free of deprecation warnings.
+    """
+    register_resolver = getattr(OmegaConf, "register_resolver", OmegaConf.register_new_resolver)
     if not OmegaConf.has_resolver("multiply"):
-        OmegaConf.register_new_resolver("multiply", lambda x, y: x * y, replace=True)
+        register_resolver("multiply", _multiply, replace=True)
     if not OmegaConf.has_resolver("divide_ceil"):
-        OmegaConf.register_new_resolver(
-            "divide_ceil", lambda x, y: int(math.ceil(x / y)), replace=True
-        )
+        register_resolver("divide_ceil", _divide_ceil, replace=True)
     if not OmegaConf.has_resolver("divide_floor"):
-        OmegaConf.register_new_resolver(
-            "divide_floor", lambda x, y: int(math.floor(x / y)), replace=True
-        )
+        register_resolver("divide_floor", _divide_floor, replace=True)
     if not OmegaConf.has_resolver("add"):
-        OmegaConf.register_new_resolver("add", lambda *numbers: sum(numbers))
+        register_resolver("add", _add)
 
 
 def _get_trainining_recipe_gpu_model_name_and_script(model_type: str):
     """Get the model base name and script for the training recipe."""
+    for prefix, (model_base_name, script) in _GPU_MODEL_TYPE_TO_SCRIPT.items():
+        if model_type.startswith(prefix):
+            return model_base_name, script
 
-    model_type_to_script = {
-        "llama": ("llama", "llama_pretrain.py"),
-        "mistral": ("mistral", "mistral_pretrain.py"),
-        "mixtral": ("mixtral", "mixtral_pretrain.py"),
-        "deepseek": ("deepseek", "deepseek_pretrain.py"),
-    }
-
-    for key in model_type_to_script:
-        if model_type.startswith(key):
-            model_type = key
-            break
-
-    if model_type not in model_type_to_script:
-        raise ValueError(f"Model type {model_type} not supported")
-
-    return model_type_to_script[model_type][0], model_type_to_script[model_type][1]
+    raise ValueError(f"Model type {model_type} not supported")
 
 
 def _configure_gpu_args(
-    training_recipes_cfg: Dict[str, Any],
     region_name: str,
     recipe: dictconfig.DictConfig,
     recipe_train_dir: tempfile.TemporaryDirectory,
@@ -162,10 +250,8 @@ def _configure_gpu_args(
     source_code = SourceCode()
     args = dict()
 
-    adapter_repo = os.environ.get("TRAINING_ADAPTER_GIT", None) or training_recipes_cfg.get(
-        "adapter_repo"
-    )
-    _run_clone_command_silent(adapter_repo, recipe_train_dir.name)
+    recipe_endpoints = _get_recipe_endpoints()
+    _copy_cloned_repo(recipe_endpoints.adapter_repo, recipe_train_dir.name)
 
     if "model" not in recipe:
         raise ValueError("Supplied recipe does not contain required field model.")
@@ -178,7 +264,7 @@ def _configure_gpu_args(
     source_code.source_dir = os.path.join(recipe_train_dir.name, "examples", model_base_name)
     source_code.entry_script = script
 
-    gpu_image_cfg = training_recipes_cfg.get("gpu_image")
+    gpu_image_cfg = recipe_endpoints.gpu_image
     if isinstance(gpu_image_cfg, str):
         training_image = gpu_image_cfg
     else:
@@ -204,7 +290,6 @@ def _configure_gpu_args(
 
 
 def _configure_trainium_args(
-    training_recipes_cfg: Dict[str, Any],
     region_name: str,
     recipe_train_dir: tempfile.TemporaryDirectory,
 ) -> Dict[str, Any]:
@@ -212,11 +297,12 @@ def _configure_trainium_args(
     source_code = SourceCode()
     args = dict()
 
-    _run_clone_command_silent(training_recipes_cfg.get("neuron_dist_repo"), recipe_train_dir.name)
+    recipe_endpoints = _get_recipe_endpoints()
+    _copy_cloned_repo(recipe_endpoints.neuron_dist_repo, recipe_train_dir.name)
 
     source_code.source_dir = os.path.join(recipe_train_dir.name, "examples")
     source_code.entry_script = "training_orchestrator.py"
-    neuron_image_cfg = training_recipes_cfg.get("neuron_image")
+    neuron_image_cfg = recipe_endpoints.neuron_image
     if isinstance(neuron_image_cfg, str):
         training_image = neuron_image_cfg
     else:
@@ -275,9 +361,8 @@ def _get_args_from_recipe(
     if compute.instance_type is None:
         raise ValueError("Must set `instance_type` in compute when using training recipes.")
 
-    training_recipes_cfg = _load_recipes_cfg()
     if isinstance(training_recipe, str):
-        recipe = _load_base_recipe(training_recipe, recipe_overrides, training_recipes_cfg)
+        recipe = _load_base_recipe(training_recipe, recipe_overrides)
     else:
         recipe = training_recipe
     if _is_nova_recipe(recipe):
@@ -310,22 +395,14 @@ def _get_args_from_recipe(
     device_type = _determine_device_type(compute.instance_type)
     recipe_train_dir = tempfile.TemporaryDirectory(prefix="training_")
     if device_type == "gpu":
-        args = _configure_gpu_args(training_recipes_cfg, region_name, recipe, recipe_train_dir)
+        args = _configure_gpu_args(region_name, recipe, recipe_train_dir)
     elif device_type == "trainium":
-        args = _configure_trainium_args(training_recipes_cfg, region_name, recipe_train_dir)
+        args = _configure_trainium_args(region_name, recipe_train_dir)
     else:
         raise ValueError(f"Devices of type {device_type} are not supported with training recipes.")
 
-    _register_custom_resolvers()
-
     # Resolve Final Recipe
-    final_recipe = _try_resolve_recipe(recipe)
-    if final_recipe is None:
-        final_recipe = _try_resolve_recipe(recipe, "recipes")
-    if final_recipe is None:
-        final_recipe = _try_resolve_recipe(recipe, "training")
-    if final_recipe is None:
-        raise RuntimeError("Could not resolve provided recipe.")
+    final_recipe = _resolve_final_recipe(recipe)
 
     # Save Final Recipe to source_dir
     OmegaConf.save(
@@ -378,17 +455,17 @@ def _is_nova_recipe(
     Returns:
         bool: True if the recipe is a Nova recipe, False otherwise
     """
-    run_config = recipe.get("run", {})
-    model_type = run_config.get("model_type", "").lower()
-    has_nova_model = (
-        model_type and "amazon.nova" in model_type and "model_name_or_path" in run_config
+    # Check for distillation data first since it is a single lookup
+    training_config = recipe.get("training_config") or {}
+    if training_config.get("distillation_data") is not None:
+        return True
+
+    run_config = recipe.get("run") or {}
+    model_type = run_config.get("model_type")
+    return bool(
+        model_type and "amazon.nova" in model_type.lower() and "model_name_or_path" in run_config
     )
 
-    # Check for distillation data
-    training_config = recipe.get("training_config", {})
-    has_distillation = training_config.get("distillation_data") is not None
-    return bool(has_nova_model) or bool(has_distillation)
-
 def _get_args_from_nova_recipe(
     recipe: dictconfig.DictConfig,
     compute: Compute,
@@ -447,16 +524,8 @@ def _get_args_from_nova_recipe(
     if reward_lambda_arn:
         args["hyperparameters"]["reward_lambda_arn"] = reward_lambda_arn
 
-    _register_custom_resolvers()
-
     # Resolve Final Recipe
-    final_recipe = _try_resolve_recipe(recipe)
-    if final_recipe is None:
-        final_recipe = _try_resolve_recipe(recipe, "recipes")
-    if final_recipe is None:
-        final_recipe = _try_resolve_recipe(recipe, "training")
-    if final_recipe is None:
-        raise RuntimeError("Could not resolve provided recipe.")
+    final_recipe = _resolve_final_recipe(recipe)
 
     # Save Final Recipe to tmp dir
     recipe_local_dir = tempfile.TemporaryDirectory(prefix="recipe_")
@@ -475,11 +544,7 @@ def _get_args_from_nova_recipe(
 
 def _resolve_final_recipe(recipe: dictconfig.DictConfig):
     """Resolve final recipe."""
-    final_recipe = _try_resolve_recipe(recipe)
-    if final_recipe is None:
-        final_recipe = _try_resolve_recipe(recipe, "recipes")
-    if final_recipe is None:
-        final_recipe = _try_resolve_recipe(recipe, "training")
+    final_recipe = _try_resolve_recipe(recipe, [None, "recipes", "training"])
     if final_recipe is None:
         raise RuntimeError("Could not resolve provided recipe.")
 
@@ -525,7 +590,6 @@ def _get_args_from_llmft_recipe(
 
     args = dict()
 
-    _register_custom_resolvers()
     final_recipe = _resolve_final_recipe(recipe)
 
     # Save Final Recipe to tmp dir
@@ -542,3 +606,6 @@ def _get_args_from_llmft_recipe(
         }
     )
     return args, recipe_local_dir
+
+
+_register_custom_resolvers()
@@ -18,7 +18,6 @@ from unittest.mock import patch, MagicMock
 
 import yaml
 from omegaconf import OmegaConf
-from urllib.request import urlretrieve
 from tempfile import NamedTemporaryFile
 
 from sagemaker.train.sm_recipes.utils import (
@@ -32,14 +31,21 @@ from sagemaker.train.sm_recipes.utils import (
     _is_llmft_recipe,
     _get_args_from_nova_recipe,
     _get_args_from_llmft_recipe,
+    _get_or_clone_repo,
+    _copy_cloned_repo,
+    _resolve_final_recipe,
+    _determine_device_type,
+    _try_resolve_recipe,
+    _get_recipe_endpoints,
+    _RECIPE_DOWNLOAD_TIMEOUT_SECONDS,
 )
 from sagemaker.train.utils import _run_clone_command_silent
 from sagemaker.train.configs import Compute
 
 
 @pytest.fixture(scope="module")
-def training_recipes_cfg():
-    return _load_recipes_cfg()
+def recipe_endpoints():
+    return _get_recipe_endpoints()
 
 
 @pytest.fixture(scope="module")
@@ -54,7 +60,7 @@ def temporary_recipe():
         yield f.name
 
 
-def test_load_base_recipe_with_overrides(temporary_recipe, training_recipes_cfg):
+def test_load_base_recipe_with_overrides(temporary_recipe):
     expected_epochs = 20
     expected_layers = 15
 
@@ -66,7 +72,6 @@ def test_load_base_recipe_with_overrides(temporary_recipe, training_recipes_cfg)
     load_recipe = _load_base_recipe(
         training_recipe=temporary_recipe,
         recipe_overrides=recipe_overrides,
-        training_recipes_cfg=training_recipes_cfg,
     )
 
     assert (
@@ -84,10 +89,11 @@ def test_load_base_recipe_with_overrides(temporary_recipe, training_recipes_cfg)
         {"recipe_type": "not_found"},
     ],
 )
-@patch("sagemaker.train.sm_recipes.utils.urlretrieve")
+@patch.dict("sagemaker.train.sm_recipes.utils._CLONED_REPOS", clear=True)
+@patch("sagemaker.train.sm_recipes.utils.urlopen")
 @patch("sagemaker.train.sm_recipes.utils._run_clone_command_silent")
 def test_load_base_recipe_types(
-    mock_clone, mock_retrieve, temporary_recipe, training_recipes_cfg, test_case
+    mock_clone, mock_urlopen, temporary_recipe, recipe_endpoints, test_case
 ):
     recipe_type = test_case["recipe_type"]
 
@@ -96,14 +102,12 @@ def test_load_base_recipe_types(
             _load_base_recipe(
                 training_recipe="not_found",
                 recipe_overrides=None,
-                training_recipes_cfg=training_recipes_cfg,
             )
 
     if recipe_type == "local":
         load_recipe = _load_base_recipe(
             training_recipe=temporary_recipe,
             recipe_overrides=None,
-            training_recipes_cfg=training_recipes_cfg,
         )
         assert load_recipe is not None
         assert "trainer" in load_recipe
@@ -136,23 +140,39 @@ def test_load_base_recipe_types(
                 load_recipe = _load_base_recipe(
                     training_recipe="training/llama/p4_hf_llama3_70b_seq8k_gpu",
                     recipe_overrides=None,
-                    training_recipes_cfg=training_recipes_cfg,
                 )
                 assert load_recipe is not None
                 assert "trainer" in load_recipe
-                assert mock_clone.call_args.args[0] == training_recipes_cfg.get("launcher_repo")
+                assert mock_clone.call_args.args[0] == recipe_endpoints.launcher_repo
 
     if recipe_type == "url":
         url = "https://raw.githubusercontent.com/aws-neuron/neuronx-distributed-training/refs/heads/main/examples/conf/hf_llama3_8B_config.yaml"  # noqa
-        mock_retrieve.side_effect = urlretrieve
+        mock_urlopen.return_value.__enter__.return_value.read.return_value = yaml.dump(
+            {"trainer": {"num_nodes": 1}, "model": {"model_type": "llama"}}
+        ).encode("utf-8")
         load_recipe = _load_base_recipe(
             training_recipe=url,
             recipe_overrides=None,
-            training_recipes_cfg=training_recipes_cfg,
         )
         assert load_recipe is not None
         assert "trainer" in load_recipe
-        assert mock_retrieve.call_args.args[0] == url
+        assert mock_urlopen.call_args.args[0] == url
+        assert mock_urlopen.call_args.kwargs["timeout"] == _RECIPE_DOWNLOAD_TIMEOUT_SECONDS
+
+
+@pytest.mark.parametrize(
+    "instance_type, device_type",
+    [
+        ("ml.p4d.24xlarge", "gpu"),
+        ("ml.g5.xlarge", "gpu"),
+        ("ml.trn1.32xlarge", "trainium"),
+        ("ml.trn2.48xlarge", "trainium"),
+        ("ml.c5.4xlarge", "cpu"),
+        ("ml.t3.medium", "cpu"),
+    ],
+)
+def test_determine_device_type(instance_type, device_type):
+    assert _determine_device_type(instance_type) == device_type
 
 
 @pytest.mark.parametrize(
@@ -163,6 +183,7 @@ def test_load_base_recipe_types(
         {"type": "cpu", "instance_type": "ml.c5.4xlarge"},
     ],
 )
+@patch.dict("sagemaker.train.sm_recipes.utils._CLONED_REPOS", clear=True)
 @patch("sagemaker.train.sm_recipes.utils._configure_gpu_args")
 @patch("sagemaker.train.sm_recipes.utils._configure_trainium_args")
 def test_get_args_from_recipe_compute(
@@ -240,6 +261,183 @@ def test_get_trainining_recipe_gpu_model_name_and_script(test_case):
     assert script == test_case["script"]
 
 
+def test_get_trainining_recipe_gpu_model_name_and_script_unsupported():
+    with pytest.raises(ValueError):
+        _get_trainining_recipe_gpu_model_name_and_script("gpt_neox")
+
+
+def test_load_recipes_cfg_is_cached():
+    import json
+
+    _load_recipes_cfg.cache_clear()
+    with patch("sagemaker.train.sm_recipes.utils._json_loads", wraps=json.loads) as mock_loads:
+        first = _load_recipes_cfg()
+        second = _load_recipes_cfg()
+    assert first is second
+    assert mock_loads.call_count == 1
+    assert "launcher_repo" in first
+
+
+def test_get_recipe_endpoints_env_overrides():
+    launcher_repo = "https://github.com/aws/custom-launcher.git"
+    adapter_repo = "https://github.com/aws/custom-adapter.git"
+    _get_recipe_endpoints.cache_clear()
+    try:
+        with patch.dict(
+            "os.environ",
+            {"TRAINING_LAUNCHER_GIT": launcher_repo, "TRAINING_ADAPTER_GIT": adapter_repo},
+        ):
+            recipe_endpoints = _get_recipe_endpoints()
+        assert recipe_endpoints.launcher_repo == launcher_repo
+        assert recipe_endpoints.adapter_repo == adapter_repo
+        assert recipe_endpoints.neuron_dist_repo == _load_recipes_cfg()["neuron_dist_repo"]
+    finally:
+        _get_recipe_endpoints.cache_clear()
+
+
+def _fake_clone(repo_url, dest_dir):
+    import os
+
+    os.makedirs(os.path.join(dest_dir, ".git"))
+    os.makedirs(os.path.join(dest_dir, "examples"))
+    with open(os.path.join(dest_dir, "examples", "train.py"), "w") as f:
+        f.write(repo_url)
+
+
+@patch.dict("sagemaker.train.sm_recipes.utils._CLONED_REPOS", clear=True)
+@patch("sagemaker.train.sm_recipes.utils._run_clone_command_silent")
+def test_get_or_clone_repo_clones_once(mock_clone):
+    mock_clone.side_effect = _fake_clone
+    repo_url = "https://github.com/aws/dummy-repo.git"
+
+    first = _get_or_clone_repo(repo_url)
+    second = _get_or_clone_repo(repo_url)
+
+    assert first == second
+    assert mock_clone.call_count == 1
+
+
+@patch.dict("sagemaker.train.sm_recipes.utils._CLONED_REPOS", clear=True)
+@patch("sagemaker.train.sm_recipes.utils._run_clone_command_silent")
+def test_copy_cloned_repo(mock_clone):
+    import os
+    import tempfile
+
+    mock_clone.side_effect = _fake_clone
+    repo_url = "https://github.com/aws/dummy-repo.git"
+
+    with tempfile.TemporaryDirectory() as first_dir, tempfile.TemporaryDirectory() as second_dir:
+        _copy_cloned_repo(repo_url, first_dir)
+        _copy_cloned_repo(repo_url, second_dir)
+
+        assert mock_clone.call_count == 1
+        for dest_dir in (first_dir, second_dir):
+            assert os.path.isfile(os.path.join(dest_dir, "examples", "train.py"))
+            assert not os.path.exists(os.path.join(dest_dir, ".git"))
+
+
+@patch.dict("sagemaker.train.sm_recipes.utils._CLONED_REPOS", clear=True)
+@patch("sagemaker.train.sm_recipes.utils._run_clone_command_silent")
+def test_copy_cloned_repo_keeps_symlinks(mock_clone):
+    import os
+    import tempfile
+
+    def _fake_clone_with_symlinks(repo_url, dest_dir):
+        _fake_clone(repo_url, dest_dir)
+        os.symlink("examples", os.path.join(dest_dir, "examples_link"))
+        os.symlink("missing.py", os.path.join(dest_dir, "dangling_link"))
+
+    mock_clone.side_effect = _fake_clone_with_symlinks
+    repo_url = "https://github.com/aws/dummy-repo.git"
+
+    with tempfile.TemporaryDirectory() as dest_dir:
+        _copy_cloned_repo(repo_url, dest_dir)
+
+        assert os.path.islink(os.path.join(dest_dir, "examples_link"))
+        assert os.readlink(os.path.join(dest_dir, "examples_link")) == "examples"
+        assert os.path.islink(os.path.join(dest_dir, "dangling_link"))
+
+
+@pytest.mark.parametrize(
+    "recipe",
+    [
+        {"a": 1, "b": "${a}"},
+        {"a": 1, "b": "${recipes.a}"},
+        {"a": 1, "b": "${training.a}"},
+        {"a": 1, "b": "${multiply:${recipes.a},1}"},
+    ],
+    ids=["no_wrapping", "recipes", "training", "resolver"],
+)
+def test_resolve_final_recipe(recipe):
+    final_recipe = _resolve_final_recipe(OmegaConf.create(recipe))
+    assert final_recipe["b"] == 1
+
+
+@pytest.mark.parametrize(
+    "test_case",
+    [
+        {
+            "recipe": {"a": 1, "b": "${a}", "c": "${recipes.a}"},
+            "expected": {"a": 1, "b": 1, "c": 1},
+        },
+        {
+            "recipe": {"a": 1, "b": "${training.a}", "c": "${recipes.a}", "training": {"a": 5}},
+            "expected": {"a": 1, "b": 5, "c": 1, "training": {"a": 5}},
+        },
+        {
+            "recipe": {"a": 1, "b": "${oc.select:training.a,7}", "c": "${training.a}"},
+            "expected": {"a": 1, "b": 7, "c": 1},
+        },
+    ],
+    ids=["mixed_root_and_recipes", "mixed_training_and_recipes", "oc_select_default"],
+)
+def test_resolve_final_recipe_mixed_interpolations(test_case):
+    # Mixed-style recipes rely on the unwrapped attempt partially resolving them in place
+    final_recipe = _resolve_final_recipe(OmegaConf.create(test_case["recipe"]))
+    assert OmegaConf.to_container(final_recipe) == test_case["expected"]
+
+
+def test_resolve_final_recipe_with_custom_resolvers():
+    recipe = OmegaConf.create(
+        {
+            "a": 6,
+            "b": 4,
+            "product": "${multiply:${a},${b}}",
+            "ceil": "${divide_ceil:${a},${b}}",
+            "floor": "${divide_floor:${a},${b}}",
+            "total": "${add:${a},${b},1}",
+        }
+    )
+    final_recipe = _resolve_final_recipe(recipe)
+    assert final_recipe["product"] == 24
+    assert final_recipe["ceil"] == 2
+    assert final_recipe["floor"] == 1
+    assert final_recipe["total"] == 11
+
+
+def test_try_resolve_recipe_falls_back_to_next_key():
+    recipe = OmegaConf.create({"a": 1, "b": "${recipes.a}"})
+    final_recipe = _try_resolve_recipe(recipe, [None, "recipes"])
+    assert final_recipe == {"a": 1, "b": 1}
+
+
+def test_try_resolve_recipe_keeps_partial_resolution_across_attempts():
+    # The unwrapped attempt resolves ${a} before failing, which lets the wrapped attempt succeed
+    recipe = OmegaConf.create({"a": 1, "b": "${a}", "c": "${recipes.a}"})
+    final_recipe = _try_resolve_recipe(recipe, [None, "recipes"])
+    assert final_recipe == {"a": 1, "b": 1, "c": 1}
+
+
+def test_try_resolve_recipe_returns_none_when_all_keys_fail():
+    recipe = OmegaConf.create({"b": "${missing.a}"})
+    assert _try_resolve_recipe(recipe, [None, "recipes", "training"]) is None
+
+
+def test_resolve_final_recipe_unresolvable():
+    with pytest.raises(RuntimeError):
+        _resolve_final_recipe(OmegaConf.create({"b": "${missing.a}"}))
+
+
 def test_get_args_from_recipe_with_evaluation(temporary_recipe):
     import tempfile
     import os
@@ -355,6 +553,58 @@ def test_is_llmft_recipe(test_case):
     assert is_llmft == test_case["is_llmft"]
 
 
+@pytest.mark.parametrize(
+    "test_case",
+    [
+        {
+            "recipe": {"run": {"model_type": "amazon.nova", "model_name_or_path": "nova-pro"}},
+            "is_nova": True,
+        },
+        {
+            "recipe": {"run": {"model_type": "Amazon.Nova-Micro", "model_name_or_path": "nova"}},
+            "is_nova": True,
+        },
+        {
+            "recipe": {"run": {"model_type": "amazon.nova"}},
+            "is_nova": False,
+        },
+        {
+            "recipe": {"training_config": {"distillation_data": "true"}},
+            "is_nova": True,
+        },
+        {
+            "recipe": {"run": {"model_type": "llama_v3", "model_name_or_path": "llama"}},
+            "is_nova": False,
+        },
+        {
+            "recipe": {"trainer": {"num_nodes": 1}},
+            "is_nova": False,
+        },
+        {
+            "recipe": {"run": {"model_type": None, "model_name_or_path": "x"}},
+            "is_nova": False,
+        },
+        {
+            "recipe": {"run": None, "training_config": None},
+            "is_nova": False,
+        },
+    ],
+    ids=[
+        "nova_model",
+        "nova_model_mixed_case",
+        "nova_missing_model_name_or_path",
+        "distillation",
+        "non_nova_model",
+        "no_run_or_training_config",
+        "null_model_type",
+        "null_run_and_training_config",
+    ],
+)
+def test_is_nova_recipe(test_case):
+    recipe = OmegaConf.create(test_case["recipe"])
+    assert _is_nova_recipe(recipe) == test_case["is_nova"]
+
+
 @patch("sagemaker.train.sm_recipes.utils._get_args_from_llmft_recipe")
 def test_get_args_from_recipe_with_llmft_and_role(mock_get_args_from_llmft_recipe):
     # Set up mock return value